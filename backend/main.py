@@ -1,16 +1,27 @@
 import os
-import json
+import asyncio
 import uuid
+import hashlib
+import time
+import threading
+from array import array
+from collections import Counter
 from datetime import datetime
 from typing import Optional
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import FastAPI, HTTPException, status, Request
+from fastapi import FastAPI, HTTPException, status, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 import aiomysql
+import orjson
 import boto3
-from botocore.exceptions import ClientError
+import redis.asyncio as redis
+from cachetools import TTLCache
+from botocore.config import Config
+from botocore.exceptions import ClientError, ParamValidationError
 import logging
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -23,21 +34,60 @@ logger = logging.getLogger(__name__)
 # Database pool global variable
 db_pool = None
 
+# Conversation turns waiting to be written by the batching writer task. Rows are only taken off
+# the queue while holding conversation_write_lock, so a session delete can't race a pending write
+conversation_queue = asyncio.Queue()
+conversation_queued = asyncio.Event()
+conversation_write_lock = asyncio.Lock()
+writer_task = None
+
+# Queued or in-flight turns per session that this replica has not written to MySQL yet
+pending_writes = Counter()
+
+# Current history epoch per session as {'turns': [...], 'total_turns': n}. Other replicas may serve
+# the same session, so warm entries are checked against the stored turn count before reuse
+session_history_cache = TTLCache(maxsize=10_000, ttl=1800)
+
+# Bedrock client global variable (shared across requests)
+bedrock_client = None
+
+# Redis client global variable (None when the semantic cache is disabled)
+redis_client = None
+
+# Last /health result as (checked_at, health_status, etag), reused for HEALTH_CACHE_TTL seconds
+health_cache = None
+
+# Bedrock latency-optimized inference flag (cleared if the model rejects it)
+bedrock_latency_optimized = os.getenv('BEDROCK_LATENCY_OPT', '0') == '1'
+
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global db_pool
+    global db_pool, redis_client, bedrock_client, writer_task
+    # Size the thread pool used for blocking Bedrock calls to match the client's connection pool
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BEDROCK_MAX_CONNECTIONS)
+    )
     db_pool = await create_db_pool()
     await initialize_database()
+    writer_task = asyncio.create_task(conversation_writer())
+    bedrock_client = get_bedrock_client()
+    redis_client = await create_redis_client()
+    logger.info(f"Bedrock inference mode: {'optimized' if bedrock_latency_optimized else 'standard'}")
     logger.info("Application started successfully")
     
     yield
     
     # Shutdown
+    # Flush queued conversation turns before the pool closes
+    await conversation_queue.join()
+    writer_task.cancel()
     if db_pool:
         db_pool.close()
         await db_pool.wait_closed()
+    if redis_client:
+        await redis_client.aclose()
     logger.info("Application shut down successfully")
 
 # Initialize FastAPI app
@@ -48,8 +98,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# Initialize rate limiter (shared across workers and replicas via Redis when REDIS_URL is set)
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=os.getenv('REDIS_URL', 'memory://'),
+    strategy="fixed-window",
+    in_memory_fallback_enabled=True
+)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -67,6 +122,15 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=4000, description="User message")
     session_id: Optional[str] = Field(None, description="Optional session ID for conversation continuity")
 
+    @field_validator('message')
+    @classmethod
+    def strip_message(cls, value: str) -> str:
+        """Reject whitespace-only messages before any database or Bedrock work"""
+        value = value.strip()
+        if not value:
+            raise ValueError("Message must not be blank")
+        return value
+
 class ChatResponse(BaseModel):
     response: str
     session_id: str
@@ -81,10 +145,49 @@ DB_CONFIG = {
     'autocommit': True,
 }
 
+# Connection pool sizing: keep enough warm connections that bursts don't open new ones in handlers,
+# and recycle them before MySQL's wait_timeout silently drops idle connections
+DB_POOL_MAXSIZE = int(os.getenv('DB_POOL_MAXSIZE', '32'))
+DB_POOL_MINSIZE = min(int(os.getenv('DB_POOL_MINSIZE', str((os.cpu_count() or 1) * 2 + 1))), DB_POOL_MAXSIZE)
+DB_POOL_RECYCLE = 1800  # seconds
+DB_CONNECT_TIMEOUT = 5  # seconds
+
+HEALTH_CACHE_TTL = 2  # seconds
+
+# Conversation writes are coalesced into multi-row INSERTs
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_INTERVAL = 0.05  # seconds
+
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-2')
+# Prompt history is a growing "cache epoch" so the prefix sent to the model stays byte-identical
+# across consecutive turns; once it exceeds HISTORY_EPOCH_TURNS turns or HISTORY_CHAR_BUDGET
+# characters it restarts from the last few turns that fit HISTORY_EPOCH_RESET_CHARS, leaving
+# headroom so the new epoch can grow for several turns before the next reset
+HISTORY_EPOCH_TURNS = 20
+HISTORY_EPOCH_KEEP = 5
+HISTORY_CHAR_BUDGET = 6000
+HISTORY_EPOCH_RESET_CHARS = HISTORY_CHAR_BUDGET // 2
+HISTORY_MESSAGE_CHAR_LIMIT = 1500  # Longer history messages are clipped before reaching the model
+TRUNCATION_SUFFIX = "…[truncated]"
 BEDROCK_MODEL_ID = "deepseek.v3-v1:0"
+BEDROCK_MAX_CONNECTIONS = 50
+
+# Semantic cache configuration (disabled when REDIS_URL is not set)
+REDIS_URL = os.getenv('REDIS_URL')
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+EMBEDDING_DIMENSIONS = 256
+SEMANTIC_CACHE_INDEX = "idx:chat_cache"
+SEMANTIC_CACHE_PREFIX = "chat_cache:"
+SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', '300'))  # seconds
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.1'))  # cosine distance
 
 # Database functions
+# executemany rewrites this into one multi-row INSERT, so batches cost a single round trip
+INSERT_CONVERSATION_QUERY = """
+INSERT INTO conversations (session_id, user_message, ai_response)
+VALUES (%s, %s, %s)
+"""
+
 async def create_db_pool():
     """Create MySQL connection pool with SSL/TLS encryption"""
     try:
@@ -95,10 +198,12 @@ async def create_db_pool():
             password=DB_CONFIG['password'],
             db=DB_CONFIG['db'],
             autocommit=DB_CONFIG['autocommit'],
-            minsize=1,
-            maxsize=10
+            minsize=DB_POOL_MINSIZE,
+            maxsize=DB_POOL_MAXSIZE,
+            pool_recycle=DB_POOL_RECYCLE,
+            connect_timeout=DB_CONNECT_TIMEOUT
         )
-        logger.info("Database pool created successfully")
+        logger.info(f"Database pool created successfully (minsize={DB_POOL_MINSIZE}, maxsize={DB_POOL_MAXSIZE})")
         return pool
     except Exception as e:
         logger.error(f"Failed to create database pool: {str(e)}")
@@ -113,8 +218,7 @@ async def initialize_database():
         user_message TEXT NOT NULL,
         ai_response TEXT NOT NULL,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        INDEX idx_session_id (session_id),
-        INDEX idx_created_at (created_at)
+        INDEX idx_session_created (session_id, created_at DESC)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
     """
     
@@ -122,29 +226,156 @@ async def initialize_database():
         async with db_pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(create_table_query)
+                # No query filters on created_at alone, so the old index only slows down INSERTs
+                await drop_index(cur, "idx_created_at")
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {str(e)}")
         raise
 
-async def save_conversation(session_id: str, user_message: str, ai_response: str):
-    """Save conversation to database"""
-    insert_query = """
-    INSERT INTO conversations (session_id, user_message, ai_response)
-    VALUES (%s, %s, %s)
+async def index_exists(cur, index_name: str) -> bool:
+    """Check whether the conversations table has an index with this name"""
+    await cur.execute(
+        """
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'conversations' AND index_name = %s
+        LIMIT 1
+        """,
+        (index_name,)
+    )
+    return await cur.fetchone() is not None
+
+async def ensure_index(cur, index_name: str, columns: str):
+    """Add an index to the conversations table if it does not exist yet"""
+    if await index_exists(cur, index_name):
+        return
+
+    try:
+        await cur.execute(f"ALTER TABLE conversations ADD INDEX {index_name} {columns}")
+        logger.info(f"Added index {index_name} to conversations table")
+    except aiomysql.MySQLError as e:
+        # Another replica added it concurrently (ER_DUP_KEYNAME)
+        if e.args[0] != 1061:
+            raise
+
+async def drop_index(cur, index_name: str):
+    """Drop an index from the conversations table if it exists"""
+    if not await index_exists(cur, index_name):
+        return
+
+    try:
+        await cur.execute(f"DROP INDEX {index_name} ON conversations")
+        logger.info(f"Dropped index {index_name} from conversations table")
+    except aiomysql.MySQLError as e:
+        # Another replica dropped it concurrently (ER_CANT_DROP_FIELD_OR_KEY)
+        if e.args[0] != 1091:
+            raise
+
+async def ensure_compressed(cur):
     """
+    Switch the conversations table to compressed InnoDB pages if it is not already
     
+    This rebuilds the table, so it runs from migrate.py rather than at startup.
+    """
+    await cur.execute(
+        """
+        SELECT row_format FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = 'conversations'
+        """
+    )
+    row = await cur.fetchone()
+    if row and row[0] == 'Compressed':
+        return
+
+    try:
+        await cur.execute("ALTER TABLE conversations ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8")
+        logger.info("Enabled page compression on conversations table")
+    except aiomysql.MySQLError as e:
+        # Compression is an optimization; engines without it (e.g. Aurora) keep the current format
+        logger.warning(f"Could not enable table compression: {str(e)}")
+
+async def save_conversations(rows: list):
+    """Save (session_id, user_message, ai_response) rows in a single multi-row INSERT"""
     try:
         async with db_pool.acquire() as conn:
             async with conn.cursor() as cur:
-                await cur.execute(insert_query, (session_id, user_message, ai_response))
-        logger.info(f"Conversation saved for session: {session_id}")
+                await cur.executemany(INSERT_CONVERSATION_QUERY, rows)
     except Exception as e:
         logger.error(f"Failed to save conversation: {str(e)}")
         raise
 
+def queue_conversation(session_id: str, user_message: str, ai_response: str):
+    """Queue a conversation turn for the batching writer"""
+    conversation_queue.put_nowait((session_id, user_message, ai_response))
+    pending_writes[session_id] += 1
+    conversation_queued.set()
+
+def release_pending_writes(rows: list):
+    """Stop counting rows as pending once they are saved, dropped or discarded"""
+    for row in rows:
+        pending_writes[row[0]] -= 1
+        if pending_writes[row[0]] <= 0:
+            del pending_writes[row[0]]
+
+async def conversation_writer():
+    """Drain queued conversation turns and save them in batches"""
+    while True:
+        await conversation_queued.wait()
+        # Let concurrent turns queue up behind the first so they share one INSERT
+        await asyncio.sleep(WRITE_BATCH_INTERVAL)
+        
+        async with conversation_write_lock:
+            rows = []
+            while len(rows) < WRITE_BATCH_SIZE and not conversation_queue.empty():
+                rows.append(conversation_queue.get_nowait())
+            if conversation_queue.empty():
+                conversation_queued.clear()
+            
+            try:
+                await save_rows_with_retry(rows)
+            finally:
+                release_pending_writes(rows)
+                for _ in rows:
+                    conversation_queue.task_done()
+
+async def save_rows_with_retry(rows: list):
+    """Save a batch, falling back to one INSERT per row so a bad row only loses itself"""
+    if not rows:
+        return
+    try:
+        await save_conversations(rows)
+        logger.info(f"Saved {len(rows)} conversation turn(s)")
+        return
+    except Exception:
+        logger.warning(f"Batch save of {len(rows)} conversation turn(s) failed, retrying row by row")
+    
+    for row in rows:
+        try:
+            await save_conversations([row])
+        except Exception as e:
+            logger.error(f"Dropped conversation turn for session {row[0]}: {str(e)}")
+
+def discard_queued_conversations(session_id: str) -> int:
+    """Remove a session's unsaved turns from the write queue (caller holds conversation_write_lock)"""
+    kept = []
+    discarded = []
+    while not conversation_queue.empty():
+        row = conversation_queue.get_nowait()
+        conversation_queue.task_done()
+        if row[0] == session_id:
+            discarded.append(row)
+        else:
+            kept.append(row)
+    for row in kept:
+        conversation_queue.put_nowait(row)
+    if not kept:
+        conversation_queued.clear()
+    release_pending_writes(discarded)
+    return len(discarded)
+
 async def get_conversation_history(session_id: str, limit: int = 10):
-    """Retrieve conversation history for context"""
+    """Retrieve conversation history for context as (user_message, ai_response, created_at) tuples"""
+    # Served by idx_session_created as a bounded index range scan (no filesort)
     select_query = """
     SELECT user_message, ai_response, created_at
     FROM conversations
@@ -155,7 +386,7 @@ async def get_conversation_history(session_id: str, limit: int = 10):
     
     try:
         async with db_pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
+            async with conn.cursor() as cur:
                 await cur.execute(select_query, (session_id, limit))
                 result = await cur.fetchall()
                 return list(reversed(result))  # Return in chronological order
@@ -163,81 +394,408 @@ async def get_conversation_history(session_id: str, limit: int = 10):
         logger.error(f"Failed to retrieve conversation history: {str(e)}")
         return []
 
+async def count_conversation_turns(session_id: str) -> Optional[int]:
+    """Count a session's stored turns (index-only on idx_session_created), or None on error"""
+    try:
+        async with db_pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT COUNT(*) FROM conversations WHERE session_id = %s", (session_id,))
+                row = await cur.fetchone()
+                return row[0]
+    except Exception as e:
+        logger.error(f"Failed to count conversation turns: {str(e)}")
+        return None
+
+def clip_message(text: str) -> str:
+    """Clip a history message to HISTORY_MESSAGE_CHAR_LIMIT characters"""
+    if len(text) <= HISTORY_MESSAGE_CHAR_LIMIT:
+        return text
+    return text[:HISTORY_MESSAGE_CHAR_LIMIT] + TRUNCATION_SUFFIX
+
+def history_turn(user_message: str, ai_response: str) -> dict:
+    """Build a history epoch entry with both messages clipped"""
+    return {'user_message': clip_message(user_message), 'ai_response': clip_message(ai_response)}
+
+def turn_chars(entry: dict) -> int:
+    """Count the characters a history entry adds to the prompt"""
+    return len(entry['user_message']) + len(entry['ai_response'])
+
+def start_epoch(turns: list) -> list:
+    """Start a new history epoch from the most recent turns that fit HISTORY_EPOCH_RESET_CHARS"""
+    epoch = []
+    chars = 0
+    for entry in reversed(turns[-HISTORY_EPOCH_KEEP:]):
+        chars += turn_chars(entry)
+        if chars > HISTORY_EPOCH_RESET_CHARS:
+            break
+        epoch.append(entry)
+    epoch.reverse()
+    return epoch
+
+def epoch_view(entry: dict) -> tuple:
+    """Return (turns, epoch_start), where epoch_start is the session turn number the epoch begins at"""
+    return list(entry['turns']), entry['total_turns'] - len(entry['turns'])
+
+async def get_recent_history(session_id: str, is_new: bool = False) -> tuple:
+    """Return the session's current history epoch as (turns, epoch_start), reloading it when stale"""
+    entry = session_history_cache.get(session_id)
+    if is_new and entry is not None:
+        # Generated by this request, so no replica can have stored turns for it yet
+        return epoch_view(entry)
+    
+    stored_turns = await count_conversation_turns(session_id)
+    if entry is not None:
+        # Turns saved or deleted through another replica change the count, so only reuse a matching epoch
+        if stored_turns is None or stored_turns + pending_writes[session_id] == entry['total_turns']:
+            return epoch_view(entry)
+    
+    rows = await get_conversation_history(session_id, limit=HISTORY_EPOCH_KEEP)
+    turns = start_epoch([history_turn(user_message, ai_response) for user_message, ai_response, _ in rows])
+    total_turns = (stored_turns if stored_turns is not None else len(rows)) + pending_writes[session_id]
+    entry = {'turns': turns, 'total_turns': total_turns}
+    session_history_cache[session_id] = entry
+    return epoch_view(entry)
+
+def record_turn(session_id: str, user_message: str, ai_response: str):
+    """Append a completed turn to the session's history epoch, resetting it once it grows too long"""
+    entry = session_history_cache.get(session_id)
+    if entry is None:
+        # Evicted or deleted mid-request: a one-turn epoch would hide earlier context stored in
+        # MySQL, so let the next request reload the session from the database instead
+        return
+    turns = entry['turns'] + [history_turn(user_message, ai_response)]
+    if len(turns) > HISTORY_EPOCH_TURNS or sum(map(turn_chars, turns)) > HISTORY_CHAR_BUDGET:
+        turns = start_epoch(turns)
+    session_history_cache[session_id] = {'turns': turns, 'total_turns': entry['total_turns'] + 1}
+
+# Semantic cache functions
+async def create_redis_client():
+    """Connect to Redis and ensure the semantic cache vector index exists"""
+    if not REDIS_URL:
+        logger.info("REDIS_URL not set, semantic cache disabled")
+        return None
+
+    try:
+        client = redis.from_url(REDIS_URL)
+        await client.ping()
+        try:
+            await client.execute_command("FT.INFO", SEMANTIC_CACHE_INDEX)
+        except redis.ResponseError:
+            await client.execute_command(
+                "FT.CREATE", SEMANTIC_CACHE_INDEX,
+                "ON", "HASH",
+                "PREFIX", "1", SEMANTIC_CACHE_PREFIX,
+                "SCHEMA",
+                "context", "TAG",
+                "embedding", "VECTOR", "HNSW", "6",
+                "TYPE", "FLOAT32",
+                "DIM", str(EMBEDDING_DIMENSIONS),
+                "DISTANCE_METRIC", "COSINE",
+            )
+        logger.info("Semantic cache connected to Redis")
+        return client
+    except Exception as e:
+        logger.warning(f"Semantic cache disabled, Redis unavailable: {str(e)}")
+        return None
+
+def get_cache_context(session_id: str, epoch_start: int) -> str:
+    """Hash the session and history epoch so cached answers never cross sessions or epochs"""
+    # Keyed on where the epoch starts rather than its contents, so a message repeated later
+    # in the same epoch still matches the answer cached on an earlier turn
+    return hashlib.sha256(f"{session_id}\x00{epoch_start}".encode('utf-8')).hexdigest()
+
+async def get_embedding(text: str) -> Optional[bytes]:
+    """Embed text with Titan and return it packed as FLOAT32 bytes for Redis"""
+    try:
+        raw_body = await asyncio.to_thread(
+            invoke_model_body,
+            modelId=EMBEDDING_MODEL_ID,
+            body=orjson.dumps({
+                "inputText": text,
+                "dimensions": EMBEDDING_DIMENSIONS,
+                "normalize": True,
+            })
+        )
+        response_body = orjson.loads(raw_body)
+        return array('f', response_body['embedding']).tobytes()
+    except Exception as e:
+        logger.warning(f"Failed to compute embedding: {str(e)}")
+        return None
+
+async def semantic_cache_lookup(context: str, embedding: bytes) -> Optional[str]:
+    """Return a cached response for a semantically similar message in the same context"""
+    try:
+        result = await redis_client.execute_command(
+            "FT.SEARCH", SEMANTIC_CACHE_INDEX,
+            f"(@context:{{{context}}})=>[KNN 1 @embedding $vec AS distance]",
+            "PARAMS", "2", "vec", embedding,
+            "RETURN", "2", "response", "distance",
+            "SORTBY", "distance",
+            "DIALECT", "2",
+        )
+        if not result or result[0] == 0:
+            return None
+
+        fields = result[2]
+        document = dict(zip(fields[::2], fields[1::2]))
+        if float(document[b'distance']) > SEMANTIC_CACHE_THRESHOLD:
+            return None
+        return document[b'response'].decode('utf-8')
+    except Exception as e:
+        logger.warning(f"Semantic cache lookup failed: {str(e)}")
+        return None
+
+async def semantic_cache_store(context: str, embedding: bytes, ai_response: str):
+    """Store a response in the semantic cache with a TTL"""
+    key = f"{SEMANTIC_CACHE_PREFIX}{uuid.uuid4().hex}"
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={
+                "context": context,
+                "embedding": embedding,
+                "response": ai_response,
+            })
+            pipe.expire(key, SEMANTIC_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Semantic cache store failed: {str(e)}")
+
 # AWS Bedrock functions
 def get_bedrock_client():
-    """Initialize AWS Bedrock client"""
+    """Initialize AWS Bedrock client with a pooled, keepalive HTTP session"""
     try:
         client = boto3.client(
             service_name='bedrock-runtime',
-            region_name=AWS_REGION
+            region_name=AWS_REGION,
+            config=Config(
+                max_pool_connections=BEDROCK_MAX_CONNECTIONS,
+                retries={'max_attempts': 2, 'mode': 'adaptive'},
+                tcp_keepalive=True
+            )
         )
         return client
     except Exception as e:
         logger.error(f"Failed to create Bedrock client: {str(e)}")
         raise
 
+def invoke_model_body(**kwargs) -> bytes:
+    """Invoke a Bedrock model and read the response body (blocking, run in a worker thread)"""
+    response = bedrock_client.invoke_model(**kwargs)
+    return response['body'].read()
+
+def invoke_model_stream(**kwargs):
+    """Start a streaming Bedrock invocation and return its event stream (blocking, run in a worker thread)"""
+    response = bedrock_client.invoke_model_with_response_stream(**kwargs)
+    return response['body']
+
+def invoke_chat_model(body: bytes, stream: bool = False):
+    """Invoke the chat model, falling back to standard latency if optimized is unsupported"""
+    global bedrock_latency_optimized
+    invoke = invoke_model_stream if stream else invoke_model_body
+    if bedrock_latency_optimized:
+        try:
+            return invoke(
+                modelId=BEDROCK_MODEL_ID,
+                body=body,
+                performanceConfigLatency='optimized'
+            )
+        except ClientError as e:
+            # ValidationException also covers unrelated input problems; only a rejected latency
+            # setting should disable optimized mode for the process
+            error_message = e.response['Error']['Message'].lower()
+            if e.response['Error']['Code'] != 'ValidationException' or not (
+                'performanceconfig' in error_message or 'latency' in error_message
+            ):
+                raise
+            logger.warning(
+                f"Latency-optimized inference rejected for {BEDROCK_MODEL_ID}, "
+                f"falling back to standard: {e.response['Error']['Message']}"
+            )
+            bedrock_latency_optimized = False
+        except ParamValidationError as e:
+            # Installed botocore predates performanceConfigLatency
+            logger.warning(f"Latency-optimized inference unavailable, falling back to standard: {str(e)}")
+            bedrock_latency_optimized = False
+
+    return invoke(
+        modelId=BEDROCK_MODEL_ID,
+        body=body
+    )
+
+def build_chat_request_body(message: str, conversation_history: list = None) -> bytes:
+    """Build the DeepSeek request body from the history epoch and the current message"""
+    messages = []
+    
+    # Add the whole history epoch so the prompt prefix is stable across turns
+    if conversation_history:
+        for entry in conversation_history:
+            messages.append({
+                "role": "user",
+                "content": entry['user_message']
+            })
+            messages.append({
+                "role": "assistant",
+                "content": entry['ai_response']
+            })
+    
+    # Add current message
+    messages.append({
+        "role": "user",
+        "content": message
+    })
+    
+    # Prepare request body for DeepSeek
+    request_body = {
+        "messages": messages,
+        "max_tokens": 2048,
+        "temperature": 0.7,
+        "top_p": 0.9,
+    }
+    return orjson.dumps(request_body)
+
+def bedrock_http_exception(e: Exception) -> HTTPException:
+    """Log a Bedrock failure and map it to the HTTP error returned to the client"""
+    if isinstance(e, ClientError):
+        error_code = e.response['Error']['Code']
+        error_message = e.response['Error']['Message']
+        logger.error(f"AWS Bedrock error ({error_code}): {error_message}")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI service error: {error_message}"
+        )
+    logger.error(f"Unexpected error calling Bedrock: {str(e)}")
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Failed to get AI response"
+    )
+
 async def call_deepseek(message: str, conversation_history: list = None) -> str:
     """Call AWS Bedrock DeepSeek V3.1 model"""
     try:
-        bedrock_client = get_bedrock_client()
+        request_body = build_chat_request_body(message, conversation_history)
         
-        # Build conversation context
-        messages = []
-        
-        # Add conversation history if available
-        if conversation_history:
-            for entry in conversation_history[-5:]:  # Last 5 exchanges for context
-                messages.append({
-                    "role": "user",
-                    "content": entry['user_message']
-                })
-                messages.append({
-                    "role": "assistant",
-                    "content": entry['ai_response']
-                })
-        
-        # Add current message
-        messages.append({
-            "role": "user",
-            "content": message
-        })
-        
-        # Prepare request body for DeepSeek
-        request_body = {
-            "messages": messages,
-            "max_tokens": 2048,
-            "temperature": 0.7,
-            "top_p": 0.9,
-        }
-        
-        # Call Bedrock
-        response = bedrock_client.invoke_model(
-            modelId=BEDROCK_MODEL_ID,
-            body=json.dumps(request_body)
-        )
+        # Call Bedrock in a worker thread so the event loop keeps serving requests
+        raw_body = await asyncio.to_thread(invoke_chat_model, request_body)
         
         # Parse response for DeepSeek
-        response_body = json.loads(response['body'].read())
+        response_body = orjson.loads(raw_body)
         # DeepSeek uses OpenAI-compatible format
         ai_response = response_body['choices'][0]['message']['content']
         
         logger.info("Successfully received response from DeepSeek V3.1")
         return ai_response
         
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        error_message = e.response['Error']['Message']
-        logger.error(f"AWS Bedrock error ({error_code}): {error_message}")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"AI service error: {error_message}"
-        )
     except Exception as e:
-        logger.error(f"Unexpected error calling Bedrock: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get AI response"
-        )
+        raise bedrock_http_exception(e)
+
+async def start_deepseek_stream(message: str, conversation_history: list = None):
+    """Start a streaming DeepSeek invocation and return the Bedrock event stream"""
+    try:
+        request_body = build_chat_request_body(message, conversation_history)
+        return await asyncio.to_thread(invoke_chat_model, request_body, True)
+    except Exception as e:
+        raise bedrock_http_exception(e)
+
+async def iter_deepseek_deltas(event_stream):
+    """Yield text deltas from a DeepSeek event stream without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    deltas = asyncio.Queue()
+    stop = threading.Event()
+    
+    def read_stream():
+        # One worker thread owns the stream for both reading and closing; it isn't thread-safe
+        try:
+            for event in event_stream:
+                if stop.is_set():
+                    break
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                # Streaming chunks use the OpenAI-compatible delta format
+                choices = orjson.loads(chunk['bytes']).get('choices') or []
+                if choices:
+                    delta = (choices[0].get('delta') or {}).get('content')
+                    if delta:
+                        loop.call_soon_threadsafe(deltas.put_nowait, delta)
+        except Exception as e:
+            loop.call_soon_threadsafe(deltas.put_nowait, e)
+        finally:
+            event_stream.close()
+            loop.call_soon_threadsafe(deltas.put_nowait, None)
+    
+    loop.run_in_executor(None, read_stream)
+    try:
+        while True:
+            item = await deltas.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # On client disconnect the reader stops at its next event and closes the stream itself
+        stop.set()
+
+# Chat helpers
+def resolve_session_id(session_id: Optional[str]) -> tuple:
+    """Validate a client-provided session ID or generate a new one, returning (session_id, is_new)"""
+    if session_id:
+        # Only the canonical 32-char hex and 36-char dashed forms fit the VARCHAR(36) column;
+        # uuid.UUID alone also accepts braces and urn:uuid: prefixes
+        try:
+            parsed = uuid.UUID(session_id)
+        except ValueError:
+            parsed = None
+        if parsed is None or session_id.lower() not in (parsed.hex, str(parsed)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid session ID"
+            )
+        return session_id, False
+    
+    session_id = uuid.uuid4().hex
+    # A freshly generated session has no rows yet, so skip the history queries
+    session_history_cache[session_id] = {'turns': [], 'total_turns': 0}
+    return session_id, True
+
+async def prepare_chat(session_id: str, is_new: bool, message: str):
+    """
+    Load conversation history and check the semantic cache
+    
+    Returns (conversation_history, cache_context, embedding, cached_response).
+    """
+    if not redis_client:
+        conversation_history, _ = await get_recent_history(session_id, is_new)
+        return conversation_history, None, None, None
+    
+    # History lookup and message embedding are independent, so run them concurrently
+    (conversation_history, epoch_start), embedding = await asyncio.gather(
+        get_recent_history(session_id, is_new),
+        get_embedding(message)
+    )
+    
+    # Check semantic cache for a similar message in the same context
+    cache_context = get_cache_context(session_id, epoch_start)
+    cached_response = None
+    if embedding:
+        cached_response = await semantic_cache_lookup(cache_context, embedding)
+        if cached_response is not None:
+            logger.info(f"Semantic cache hit for session: {session_id}")
+    return conversation_history, cache_context, embedding, cached_response
+
+def complete_turn(background_tasks: BackgroundTasks, session_id: str, message: str,
+                  ai_response: str, cache_context: Optional[str], embedding: Optional[bytes]):
+    """Record a finished turn in the session cache and queue it for the database writer"""
+    record_turn(session_id, message, ai_response)
+    queue_conversation(session_id, message, ai_response)
+    
+    # Cache the response for similar follow-up messages
+    if embedding:
+        background_tasks.add_task(semantic_cache_store, cache_context, embedding, ai_response)
+
+def sse_event(data: dict) -> bytes:
+    """Encode a Server-Sent Events data frame"""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
 
 # API Endpoints
 @app.get("/")
@@ -250,8 +808,36 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check():
-    """Detailed health check"""
+async def health_check(request: Request, response: Response):
+    """Detailed health check (cached briefly, supports If-None-Match)"""
+    global health_cache
+    if health_cache is None or time.monotonic() - health_cache[0] >= HEALTH_CACHE_TTL:
+        health_status = await check_health()
+        # Weak ETag: it covers the health state but not the timestamp, so bodies aren't byte-identical
+        etag = 'W/"' + hashlib.sha256(
+            f"{health_status['status']}:{health_status['database']}".encode('utf-8')
+        ).hexdigest()[:16] + '"'
+        health_cache = (time.monotonic(), health_status, etag)
+    
+    _, health_status, etag = health_cache
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return health_status
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weakly compare an If-None-Match header (a list of tags or "*") against an ETag"""
+    if not if_none_match:
+        return False
+    opaque_tag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque_tag:
+            return True
+    return False
+
+async def check_health() -> dict:
+    """Check database connectivity and build the health status"""
     health_status = {
         "status": "healthy",
         "database": "unknown",
@@ -271,18 +857,20 @@ async def health_check():
     
     return health_status
 
-@app.post("/chat", response_model=ChatResponse)
-@limiter.limit("5/minute")  # 5 requests per minute per IP address
-async def chat(request: Request, chat_request: ChatRequest):
+# Returns a plain dict, so skip response_model validation but keep the schema in the OpenAPI docs
+@app.post("/chat", response_model=None, responses={200: {"model": ChatResponse}})
+@limiter.shared_limit("5/minute", scope="chat")  # 5 requests per minute per IP address, shared with /chat/stream
+async def chat(request: Request, chat_request: ChatRequest, background_tasks: BackgroundTasks):
     """
     Chat endpoint that processes user messages and returns AI responses
     """
     try:
-        # Generate or use existing session ID
-        session_id = chat_request.session_id or str(uuid.uuid4())
-        
-        # Get conversation history for context
-        conversation_history = await get_conversation_history(session_id)
+        session_id, is_new = resolve_session_id(chat_request.session_id)
+        conversation_history, cache_context, embedding, cached_response = await prepare_chat(
+            session_id, is_new, chat_request.message
+        )
+        if cached_response is not None:
+            return {"response": cached_response, "session_id": session_id}
         
         # Call DeepSeek
         ai_response = await call_deepseek(
@@ -290,17 +878,11 @@ async def chat(request: Request, chat_request: ChatRequest):
             conversation_history=conversation_history
         )
         
-        # Save conversation to database
-        await save_conversation(
-            session_id=session_id,
-            user_message=chat_request.message,
-            ai_response=ai_response
+        complete_turn(
+            background_tasks, session_id, chat_request.message, ai_response, cache_context, embedding
         )
         
-        return ChatResponse(
-            response=ai_response,
-            session_id=session_id
-        )
+        return {"response": ai_response, "session_id": session_id}
         
     except HTTPException:
         raise
@@ -311,17 +893,83 @@ async def chat(request: Request, chat_request: ChatRequest):
             detail="An unexpected error occurred. Please try again."
         )
 
+@app.post("/chat/stream")
+@limiter.shared_limit("5/minute", scope="chat")  # Same budget as /chat
+async def chat_stream(request: Request, chat_request: ChatRequest, background_tasks: BackgroundTasks):
+    """
+    Streaming chat endpoint that sends AI response deltas as Server-Sent Events
+    
+    Events are JSON objects with a "type" of "session", "delta", "error" or "done".
+    """
+    try:
+        session_id, is_new = resolve_session_id(chat_request.session_id)
+        conversation_history, cache_context, embedding, cached_response = await prepare_chat(
+            session_id, is_new, chat_request.message
+        )
+        
+        # Start the Bedrock stream before responding so invocation errors keep their HTTP status
+        event_stream = None
+        if cached_response is None:
+            event_stream = await start_deepseek_stream(
+                message=chat_request.message,
+                conversation_history=conversation_history
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in chat stream endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Please try again."
+        )
+    
+    async def generate_events():
+        yield sse_event({"type": "session", "session_id": session_id})
+        
+        if event_stream is None:
+            yield sse_event({"type": "delta", "content": cached_response})
+            yield sse_event({"type": "done"})
+            return
+        
+        chunks = []
+        try:
+            async for delta in iter_deepseek_deltas(event_stream):
+                chunks.append(delta)
+                yield sse_event({"type": "delta", "content": delta})
+        except Exception as e:
+            logger.error(f"Bedrock stream failed for session {session_id}: {str(e)}")
+            yield sse_event({"type": "error", "detail": "Failed to get AI response"})
+            return
+        
+        logger.info("Successfully streamed response from DeepSeek V3.1")
+        # Tasks added here still run: Starlette executes background tasks after the body is sent
+        complete_turn(
+            background_tasks, session_id, chat_request.message, "".join(chunks), cache_context, embedding
+        )
+        yield sse_event({"type": "done"})
+    
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background_tasks
+    )
+
 @app.delete("/chat/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete conversation history for a session"""
     try:
         delete_query = "DELETE FROM conversations WHERE session_id = %s"
-        async with db_pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(delete_query, (session_id,))
-                affected_rows = cur.rowcount
+        # Hold the write lock so no queued or in-flight turn for this session lands after the DELETE
+        async with conversation_write_lock:
+            discarded_rows = discard_queued_conversations(session_id)
+            async with db_pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(delete_query, (session_id,))
+                    affected_rows = cur.rowcount
+        session_history_cache.pop(session_id, None)
         
-        if affected_rows == 0:
+        if affected_rows == 0 and discarded_rows == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Session not found"
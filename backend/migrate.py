@@ -0,0 +1,39 @@
+"""
+One-off schema migrations that are too slow to run during application startup
+
+Run once per environment from a backend pod:
+    kubectl exec deploy/chatbot-backend-deployment -c backend-container -- python migrate.py
+"""
+import asyncio
+
+import aiomysql
+
+from main import DB_CONFIG, DB_CONNECT_TIMEOUT, drop_index, ensure_compressed, ensure_index, logger
+
+
+async def run_migrations():
+    """Apply migrations that rebuild the conversations table or build indexes on it"""
+    conn = await aiomysql.connect(
+        host=DB_CONFIG['host'],
+        port=DB_CONFIG['port'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        db=DB_CONFIG['db'],
+        autocommit=DB_CONFIG['autocommit'],
+        connect_timeout=DB_CONNECT_TIMEOUT
+    )
+    try:
+        async with conn.cursor() as cur:
+            # Tables created before the composite index existed need it built explicitly
+            await ensure_index(cur, "idx_session_created", "(session_id, created_at DESC)")
+            # idx_session_id is a left prefix of idx_session_created, so it only adds INSERT cost;
+            # drop it only once the composite index is in place to serve history reads
+            await drop_index(cur, "idx_session_id")
+            await ensure_compressed(cur)
+        logger.info("Migrations completed successfully")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migrations())
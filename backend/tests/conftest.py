@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the backend as the top-level `main` module, the same way uvicorn loads it
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
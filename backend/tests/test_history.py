@@ -0,0 +1,121 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def clear_session_cache():
+    main.session_history_cache.clear()
+    yield
+    main.session_history_cache.clear()
+
+
+def test_clip_message_truncates_long_messages():
+    clipped = main.clip_message("a" * 2000)
+
+    assert clipped == "a" * main.HISTORY_MESSAGE_CHAR_LIMIT + main.TRUNCATION_SUFFIX
+    assert main.clip_message("short") == "short"
+
+
+def test_prefix_stays_stable_after_epoch_reset():
+    session_id = "session"
+    main.session_history_cache[session_id] = {'turns': [], 'total_turns': 0}
+
+    prompts = []
+    for turn in range(12):
+        prompts.append(main.session_history_cache[session_id]['turns'][:])
+        main.record_turn(session_id, "q" * 100, "a" * 3000)
+
+    resets = [turn for turn in range(1, len(prompts)) if prompts[turn][:len(prompts[turn - 1])] != prompts[turn - 1]]
+    assert resets, "history should exceed the budget and reset at least once"
+
+    # Each reset must leave room for the epoch to grow, so resets can't happen on consecutive turns
+    for previous, current in zip(resets, resets[1:]):
+        assert current - previous > 1
+
+    # Between resets every prompt extends the previous one, keeping the prefix byte-identical
+    for turn in range(resets[0] + 1, len(prompts)):
+        if turn not in resets:
+            assert prompts[turn][:len(prompts[turn - 1])] == prompts[turn - 1]
+
+    for prompt in prompts:
+        assert sum(map(main.turn_chars, prompt)) <= main.HISTORY_CHAR_BUDGET
+
+
+def test_record_turn_does_not_recreate_missing_session():
+    main.record_turn("evicted", "question", "answer")
+
+    assert "evicted" not in main.session_history_cache
+
+
+def test_history_reloads_after_turns_from_another_replica(monkeypatch):
+    stored = [("first", "answer one", None)]
+
+    async def count_conversation_turns(session_id):
+        return len(stored)
+
+    async def get_conversation_history(session_id, limit=10):
+        return stored[-limit:]
+
+    monkeypatch.setattr(main, "count_conversation_turns", count_conversation_turns)
+    monkeypatch.setattr(main, "get_conversation_history", get_conversation_history)
+
+    turns, _ = asyncio.run(main.get_recent_history("session"))
+    assert turns == [main.history_turn("first", "answer one")]
+
+    # Another replica saves a turn for the same session, so the cached epoch is stale
+    stored.append(("second", "answer two", None))
+
+    turns, _ = asyncio.run(main.get_recent_history("session"))
+    assert turns == [
+        main.history_turn("first", "answer one"),
+        main.history_turn("second", "answer two"),
+    ]
+
+
+def test_repeated_message_hits_semantic_cache_in_same_session(monkeypatch):
+    cache = {}
+    stored = Counter()
+
+    async def get_embedding(text):
+        return text.encode('utf-8')
+
+    async def count_conversation_turns(session_id):
+        return stored[session_id]
+
+    async def get_conversation_history(session_id, limit=10):
+        raise AssertionError("warm sessions should not reload history")
+
+    async def semantic_cache_lookup(context, embedding):
+        return cache.get((context, embedding))
+
+    async def semantic_cache_store(context, embedding, ai_response):
+        cache[(context, embedding)] = ai_response
+
+    monkeypatch.setattr(main, "redis_client", object())
+    monkeypatch.setattr(main, "get_embedding", get_embedding)
+    monkeypatch.setattr(main, "count_conversation_turns", count_conversation_turns)
+    monkeypatch.setattr(main, "semantic_cache_lookup", semantic_cache_lookup)
+    monkeypatch.setattr(main, "semantic_cache_store", semantic_cache_store)
+    monkeypatch.setattr(main, "get_conversation_history", get_conversation_history)
+    monkeypatch.setattr(main, "queue_conversation", lambda session_id, *messages: stored.update([session_id]))
+
+    async def chat(session_id, is_new, message):
+        _, cache_context, embedding, cached_response = await main.prepare_chat(session_id, is_new, message)
+        background_tasks = main.BackgroundTasks()
+        main.complete_turn(background_tasks, session_id, message, cached_response or f"answer to {message}",
+                           cache_context, embedding)
+        await background_tasks()
+        return cached_response
+
+    session_id, is_new = main.resolve_session_id(None)
+    assert asyncio.run(chat(session_id, is_new, "What is Kubernetes?")) is None
+    assert asyncio.run(chat(session_id, False, "What is a pod?")) is None
+    assert asyncio.run(chat(session_id, False, "What is Kubernetes?")) == "answer to What is Kubernetes?"
+
+    # Another session never sees this session's cached answers
+    other_session_id, is_new = main.resolve_session_id(None)
+    assert asyncio.run(chat(other_session_id, is_new, "What is Kubernetes?")) is None
@@ -1,9 +1,9 @@
 import streamlit as st
-import requests
+import httpx
 from typing import Optional
 import time
 from datetime import datetime
-import json
+import orjson
 import os
 
 # Page configuration
@@ -17,6 +17,7 @@ st.set_page_config(
 # Backend API configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://chatbot-backend-service:8000")
 API_TIMEOUT = 30  # seconds
+VISIBLE_MESSAGES = 30  # Most recent messages rendered on every rerun
 
 # Custom CSS for better UI
 st.markdown("""
@@ -75,63 +76,83 @@ def initialize_session_state():
         st.session_state.error_count = 0
 
 # API functions
+@st.cache_resource
+def get_api_client() -> httpx.Client:
+    """Shared HTTP client so connections to the backend are reused across reruns and sessions"""
+    return httpx.Client(
+        base_url=API_BASE_URL,
+        timeout=API_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=4)
+    )
+
+@st.cache_resource
+def get_health_state() -> dict:
+    """Last /health ETag seen by this process, sent back as If-None-Match"""
+    return {}
+
+@st.cache_data(ttl=10, show_spinner=False)
 def check_api_health() -> bool:
-    """Check if backend API is available"""
+    """Check if backend API is available (cached for 10s across reruns)"""
     try:
-        response = requests.get(
-            f"{API_BASE_URL}/health",
-            timeout=5
-        )
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
+        health_state = get_health_state()
+        headers = {"If-None-Match": health_state["etag"]} if "etag" in health_state else {}
+        response = get_api_client().get("/health", timeout=5, headers=headers)
+        if "etag" in response.headers:
+            health_state["etag"] = response.headers["etag"]
+        # 304 means the health state is unchanged since the last 200 with this ETag
+        return response.status_code in (200, 304)
+    except httpx.HTTPError:
         return False
 
-def send_message(message: str, session_id: Optional[str] = None) -> dict:
-    """Send message to backend API"""
+def stream_message(message: str, session_id: Optional[str], result: dict):
+    """
+    Stream an AI response from the backend API, yielding text deltas
+    
+    On completion `result` holds the "session_id", or an "error" message on failure.
+    """
     try:
         payload = {"message": message}
         if session_id:
             payload["session_id"] = session_id
         
-        response = requests.post(
-            f"{API_BASE_URL}/chat",
-            json=payload,
-            timeout=API_TIMEOUT,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        response.raise_for_status()
-        return {
-            "success": True,
-            "data": response.json()
-        }
+        with get_api_client().stream("POST", "/chat/stream", json=payload) as response:
+            if response.is_error:
+                # Load the error body while the stream is open so the handler can read it
+                response.read()
+            response.raise_for_status()
+            
+            for line in response.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = orjson.loads(line[len("data: "):])
+                
+                if event["type"] == "session":
+                    result["session_id"] = event["session_id"]
+                elif event["type"] == "delta":
+                    yield event["content"]
+                elif event["type"] == "error":
+                    result["error"] = f"Service error: {event['detail']}"
+                    return
+                elif event["type"] == "done":
+                    return
+            
+            result["error"] = "The response ended unexpectedly. Please try again."
         
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timed out. Please try again."
-        }
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Cannot connect to the chatbot service. Please try again later."
-        }
-    except requests.exceptions.HTTPError as e:
+    except httpx.TimeoutException:
+        result["error"] = "Request timed out. Please try again."
+    except httpx.TransportError:
+        result["error"] = "Cannot connect to the chatbot service. Please try again later."
+    except httpx.HTTPStatusError as e:
         error_detail = "An error occurred while processing your request."
         try:
             error_data = e.response.json()
             error_detail = error_data.get("detail", error_detail)
         except:
             pass
-        return {
-            "success": False,
-            "error": f"Service error: {error_detail}"
-        }
+        result["error"] = f"Service error: {error_detail}"
     except Exception as e:
-        return {
-            "success": False,
-            "error": f"Unexpected error: {str(e)}"
-        }
+        result["error"] = f"Unexpected error: {str(e)}"
+
 
 def clear_conversation():
     """Clear conversation history"""
@@ -146,7 +167,7 @@ def export_conversation() -> str:
         "timestamp": datetime.now().isoformat(),
         "messages": st.session_state.messages
     }
-    return json.dumps(conversation, indent=2)
+    return orjson.dumps(conversation, option=orjson.OPT_INDENT_2).decode()
 
 # UI Components
 def render_sidebar():
@@ -158,6 +179,8 @@ def render_sidebar():
         st.subheader("📡 API Status")
         if st.button("Check Connection", use_container_width=True):
             with st.spinner("Checking..."):
+                # Bypass the cached result so the button always probes the backend
+                check_api_health.clear()
                 st.session_state.api_available = check_api_health()
         
         if st.session_state.api_available is True:
@@ -234,6 +257,13 @@ def render_sidebar():
             )
             st.caption("Configure via environment variables in Kubernetes deployment")
 
+def render_message(message: dict):
+    """Render a single chat message"""
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        if "timestamp" in message:
+            st.caption(message["timestamp"])
+
 def render_chat_interface():
     """Render main chat interface"""
     # Title
@@ -249,12 +279,14 @@ def render_chat_interface():
         </div>
         """, unsafe_allow_html=True)
     
-    # Display chat messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-            if "timestamp" in message:
-                st.caption(message["timestamp"])
+    # Display chat messages (older ones only when requested, to keep reruns cheap)
+    older_messages = st.session_state.messages[:-VISIBLE_MESSAGES]
+    if older_messages and st.toggle(f"Show {len(older_messages)} older messages", key="show_older"):
+        for message in older_messages:
+            render_message(message)
+    
+    for message in st.session_state.messages[-VISIBLE_MESSAGES:]:
+        render_message(message)
     
     # Chat input
     if prompt := st.chat_input("Type your message here...", key="chat_input"):
@@ -271,48 +303,46 @@ def render_chat_interface():
             st.markdown(prompt)
             st.caption(timestamp)
         
-        # Get AI response
+        # Stream AI response as it is generated
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = send_message(prompt, st.session_state.session_id)
+            result = {}
+            ai_message = st.write_stream(
+                stream_message(prompt, st.session_state.session_id, result)
+            )
+            
+            if "error" not in result:
+                # Reset error count on success
+                st.session_state.error_count = 0
+                st.session_state.session_id = result["session_id"]
+                
+                # Save AI response
+                response_timestamp = datetime.now().strftime("%I:%M %p")
+                st.caption(response_timestamp)
+                
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": ai_message,
+                    "timestamp": response_timestamp
+                })
+                
+            else:
+                # Handle error
+                st.session_state.error_count += 1
+                error_msg = result["error"]
+                
+                st.error(f"❌ {error_msg}")
+                
+                # Suggest checking connection after multiple errors
+                if st.session_state.error_count >= 3:
+                    st.warning("Multiple errors detected. Please check the API connection in the sidebar.")
                 
-                if response["success"]:
-                    # Reset error count on success
-                    st.session_state.error_count = 0
-                    
-                    # Extract response data
-                    ai_message = response["data"]["response"]
-                    st.session_state.session_id = response["data"]["session_id"]
-                    
-                    # Display and save AI response
-                    st.markdown(ai_message)
-                    response_timestamp = datetime.now().strftime("%I:%M %p")
-                    st.caption(response_timestamp)
-                    
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": ai_message,
-                        "timestamp": response_timestamp
-                    })
-                    
-                else:
-                    # Handle error
-                    st.session_state.error_count += 1
-                    error_msg = response["error"]
-                    
-                    st.error(f"❌ {error_msg}")
-                    
-                    # Suggest checking connection after multiple errors
-                    if st.session_state.error_count >= 3:
-                        st.warning("Multiple errors detected. Please check the API connection in the sidebar.")
-                    
-                    # Add error to message history
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": f"⚠️ Error: {error_msg}",
-                        "timestamp": datetime.now().strftime("%I:%M %p"),
-                        "is_error": True
-                    })
+                # Add error to message history
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": f"⚠️ Error: {error_msg}",
+                    "timestamp": datetime.now().strftime("%I:%M %p"),
+                    "is_error": True
+                })
         
         # Rerun to update the UI
         st.rerun()